@@ -3,7 +3,7 @@ from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 import models, schemas, crud
-from ml_model import predict_mode_with_reason
+from ml_model import predict_mode_with_reason, optimize_mode_assignment
 from typing import List
 
 # Ensure tables exist
@@ -74,3 +74,32 @@ def predict(
     except Exception as e:
         # return a clear error message for debugging rather than 500 silence
         raise HTTPException(status_code=500, detail=f"Prediction failed: {e}")
+
+# -------------------------
+# Optimize assignment for a whole day's shipments under per-mode capacity
+# -------------------------
+@app.post("/optimize-assignment")
+def optimize_assignment(request: schemas.AssignmentRequest):
+    """
+    Jointly assign modes to a batch of shipments so per-mode capacity (tons, slots) is respected.
+    Returns assignments in input order plus the distance from the unconstrained (per-shipment) optimum:
+    optimality_gap covers the placed shipments, unplaced_lower_bound / unplaced_pct the shipments
+    that capacity left unassigned (objective - unconstrained_objective == optimality_gap - unplaced_lower_bound).
+    """
+    s = request.shipments
+    try:
+        return optimize_mode_assignment(
+            weight=[x.weight for x in s],
+            volume=[x.volume for x in s],
+            distance=[x.distance for x in s],
+            priority=[x.priority for x in s],
+            available=[
+                [x.road_available, x.rail_available, x.air_available, x.water_available] for x in s
+            ],
+            capacity={m: {"tons": c.tons, "slots": c.slots} for m, c in request.capacity.items()},
+            objective={"cost": request.objective.cost, "time": request.objective.time, "co2": request.objective.co2}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Optimization failed: {e}")
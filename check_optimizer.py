@@ -0,0 +1,128 @@
+# check_optimizer.py
+# Sanity checks + benchmark for optimize_mode_assignment. Run: python check_optimizer.py
+import time
+import numpy as np
+from ml_model import MODES, optimize_mode_assignment, predict_mode_with_reason, _fit_ranked
+
+
+def random_shipments(n, seed=0, p_available=0.7):
+    rng = np.random.default_rng(seed)
+    weight = rng.integers(1, 5000, n)
+    volume = rng.integers(1, 500, n)
+    distance = rng.integers(10, 3000, n)
+    priority = rng.integers(1, 6, n)
+    available = rng.random((n, len(MODES))) < p_available
+    return weight, volume, distance, priority, available
+
+
+def tons(weight, volume):
+    return np.maximum(0.001, (weight + volume * 0.2) / 1000.0)
+
+
+def check_parity_with_scalar(n=2000):
+    # Without capacity every shipment should get the scalar heuristic's pick
+    # (priority >= 4 excluded: the scalar version forces Air there).
+    weight, volume, distance, priority, available = random_shipments(n, seed=1)
+    result = optimize_mode_assignment(weight, volume, distance, priority, available)
+    for i in range(n):
+        if priority[i] >= 4:
+            continue
+        recommended, _, _ = predict_mode_with_reason(
+            int(weight[i]), int(volume[i]), int(distance[i]), int(priority[i]), *map(int, available[i])
+        )
+        assert result["assignments"][i] == recommended, (i, result["assignments"][i], recommended)
+    assert result["optimality_gap"] == 0.0 and result["unplaced_lower_bound"] == 0.0
+    print("✅ parity with predict_mode_with_reason")
+
+
+def check_small_item_after_large():
+    # ranked 9t, 5t, 1t into 10t: the 5t doesn't fit, the 1t ranked after it still must
+    fits = _fit_ranked(np.arange(3), np.array([9.0, 5.0, 1.0]), 10.0, np.inf)
+    assert fits.tolist() == [True, False, True], fits
+    result = optimize_mode_assignment(
+        [9000, 5000, 1000], [0] * 3, [100] * 3, [1] * 3, [[0, 1, 0, 0]] * 3, capacity={"Rail": {"tons": 10}}
+    )
+    assert result["unassigned"] == 1 and result["assignments"][2] == "Rail", result["assignments"]
+    print("✅ small shipment placed after a large one that doesn't fit")
+
+
+def check_displaced_shipment_makes_room():
+    # Rail and Water have one slot each; Road is unlimited. Shipment 2 can only use Rail and wins it,
+    # so shipment 0 (prefers Rail, else Water) reaches Water after shipment 1 (prefers Water, else Road)
+    # has taken it. Shipment 1 has to move to Road so shipment 0 can ship.
+    result = optimize_mode_assignment(
+        [1000] * 3, [0] * 3, [2000] * 3, [5, 1, 1], [[0, 1, 0, 1], [1, 0, 0, 1], [0, 1, 0, 0]],
+        capacity={"Rail": {"slots": 1}, "Water": {"slots": 1}},
+        objective={"cost": 0.0, "time": 10.0, "co2": 1.0}
+    )
+    assert result["assignments"] == ["Water", "Road", "Rail"], result["assignments"]
+    print("✅ placed shipment moves to a costlier mode so an unplaced one fits")
+
+
+def check_enough_slots_places_everything(n=100_000):
+    # 4 x 25k slots for 100k shipments: everything that has a mode must ship
+    weight, volume, distance, priority, available = random_shipments(n, seed=2, p_available=0.9)
+    capacity = {m: {"slots": n // len(MODES)} for m in MODES}
+    result = optimize_mode_assignment(weight, volume, distance, priority, available, capacity=capacity)
+    assert result["unassigned"] == result["infeasible"], (result["unassigned"], result["infeasible"])
+    print(f"✅ slots-only instance places every feasible shipment ({result['infeasible']} infeasible)")
+
+
+def check_dropped_shipments_are_reported():
+    result = optimize_mode_assignment(
+        [9000, 5000, 1000], [0] * 3, [100] * 3, [1] * 3, [[0, 1, 0, 0]] * 3, capacity={"Rail": {"slots": 0}}
+    )
+    assert result["unassigned"] == 3 and result["unplaced_pct"] == 100.0, result
+    print("✅ dropped shipments show up in unplaced_pct")
+
+
+def check_capacity_feasibility(n=20000):
+    weight, volume, distance, priority, available = random_shipments(n, seed=5, p_available=0.5)
+    capacity = {
+        "Road": {"tons": 20000, "slots": 9000},
+        "Rail": {"tons": 8000},
+        "Air": {"tons": 2000, "slots": 500},
+        "Water": {"tons": 3000}
+    }
+    result = optimize_mode_assignment(weight, volume, distance, priority, available, capacity=capacity)
+    t = tons(weight, volume)
+    modes = np.array(result["assignments"])
+    left = {}
+    for k, m in enumerate(MODES):
+        on_mode = modes == m
+        assert available[on_mode, k].all(), f"{m}: shipment assigned to an unavailable mode"
+        assert t[on_mode].sum() <= capacity[m]["tons"] + 1e-6, f"{m}: tons over capacity"
+        assert on_mode.sum() <= capacity[m].get("slots", n), f"{m}: slots over capacity"
+        left[m] = (capacity[m]["tons"] - t[on_mode].sum(), capacity[m].get("slots", n) - on_mode.sum())
+
+    # nothing left unassigned that would still fit somewhere
+    for i in np.flatnonzero(modes == "None"):
+        for k, m in enumerate(MODES):
+            assert not (available[i, k] and t[i] <= left[m][0] and left[m][1] >= 1), (i, m)
+
+    gap_identity = result["optimality_gap"] - result["unplaced_lower_bound"]
+    assert abs((result["objective"] - result["unconstrained_objective"]) - gap_identity) < 1.0
+    print(f"✅ capacity respected on {n} shipments ({result['unassigned']} unassigned, none fit leftovers)")
+
+
+def benchmark(n=100_000, limit_seconds=5.0):
+    weight, volume, distance, priority, available = random_shipments(n, seed=0)
+    capacity = {"Rail": {"tons": 20000, "slots": 20000}, "Water": {"tons": 5000}, "Air": {"slots": 3000}}
+    start = time.perf_counter()
+    result = optimize_mode_assignment(weight, volume, distance, priority, available, capacity=capacity)
+    elapsed = time.perf_counter() - start
+    assert elapsed < limit_seconds, f"{n} shipments took {elapsed:.2f}s"
+    print(
+        f"✅ {n} shipments in {elapsed:.2f}s "
+        f"(gap {result['optimality_gap_pct']}%, unplaced {result['unplaced_pct']}%)"
+    )
+
+
+if __name__ == "__main__":
+    check_parity_with_scalar()
+    check_small_item_after_large()
+    check_displaced_shipment_makes_room()
+    check_enough_slots_places_everything()
+    check_dropped_shipments_are_reported()
+    check_capacity_feasibility()
+    benchmark()
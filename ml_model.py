@@ -1,6 +1,18 @@
 
 # ml_model.py
-from typing import Tuple, Dict, List
+from bisect import bisect_left
+from typing import Tuple, Dict, List, Optional
+import numpy as np
+
+MODES = ("Road", "Rail", "Air", "Water")
+
+# heuristic constants (tune these later)
+COST_PER_KM = {"Road": 5.0, "Rail": 3.0, "Air": 10.0, "Water": 2.0}
+AVG_SPEED_KMPH = {"Road": 60.0, "Rail": 80.0, "Air": 600.0, "Water": 30.0}
+CO2_PER_KM_PER_TON = {"Road": 0.2, "Rail": 0.05, "Air": 0.5, "Water": 0.02}
+
+# default weighting of the score: cost, time, emissions
+DEFAULT_OBJECTIVE = {"cost": 0.6, "time": 0.3, "co2": 0.1}
 
 def predict_mode_with_reason(
     weight: int,
@@ -32,18 +44,14 @@ def predict_mode_with_reason(
     if not available:
         return "None", ["No transport mode is available (all availability flags are false)."], {}
 
-    # heuristic constants (tune these later)
-    cost_per_km = {"Road": 5.0, "Rail": 3.0, "Air": 10.0, "Water": 2.0}
-    avg_speed_kmph = {"Road": 60.0, "Rail": 80.0, "Air": 600.0, "Water": 30.0}
-    co2_per_km_per_ton = {"Road": 0.2, "Rail": 0.05, "Air": 0.5, "Water": 0.02}
     # combine weight & volume into a rough ton-equivalent factor
     ton_equivalent = max(0.001, (weight + volume * 0.2) / 1000.0)  # tons
 
     comparison = {}
     for m in available:
-        est_cost = cost_per_km[m] * distance * (ton_equivalent * 100)  # scaled
-        time_hours = distance / avg_speed_kmph[m] if avg_speed_kmph[m] > 0 else float("inf")
-        co2_kg = co2_per_km_per_ton[m] * distance * ton_equivalent * 1000.0  # kg CO2 total for cargo (approx)
+        est_cost = COST_PER_KM[m] * distance * (ton_equivalent * 100)  # scaled
+        time_hours = distance / AVG_SPEED_KMPH[m] if AVG_SPEED_KMPH[m] > 0 else float("inf")
+        co2_kg = CO2_PER_KM_PER_TON[m] * distance * ton_equivalent * 1000.0  # kg CO2 total for cargo (approx)
         comparison[m] = {
             "estimated_cost": round(est_cost, 2),
             "time_hours": round(time_hours, 2),
@@ -60,7 +68,11 @@ def predict_mode_with_reason(
         if isinstance(priority, (int, float)):
             priority_factor = max(0.5, 1.0 - (priority - 1) * 0.12)  # higher priority -> smaller factor so time matters more
 
-        score = v["estimated_cost"] * 0.6 + (v["time_hours"] * 100.0) * 0.3 * (1.0/priority_factor) + v["co2_kg"] * 0.1
+        score = (
+            v["estimated_cost"] * DEFAULT_OBJECTIVE["cost"]
+            + (v["time_hours"] * 100.0) * DEFAULT_OBJECTIVE["time"] * (1.0/priority_factor)
+            + v["co2_kg"] * DEFAULT_OBJECTIVE["co2"]
+        )
         scores[m] = score
 
     # If priority is very high and air is available, prefer Air
@@ -83,4 +95,357 @@ def predict_mode_with_reason(
         f"for the provided inputs; priority={priority} and availability={available} considered."
     )
 
-    return recommended, reasons, comparison
\ No newline at end of file
+    return recommended, reasons, comparison
+
+def _score_matrix(weight, volume, distance, priority, objective):
+    """
+    Vectorized version of the per-shipment model used by predict_mode_with_reason.
+    Returns (ton_equivalent[n], cost[n,4], time[n,4], co2[n,4], score[n,4]) in MODES order.
+    """
+    cost_per_km = np.array([COST_PER_KM[m] for m in MODES])
+    avg_speed_kmph = np.array([AVG_SPEED_KMPH[m] for m in MODES])
+    co2_per_km_per_ton = np.array([CO2_PER_KM_PER_TON[m] for m in MODES])
+
+    ton_equivalent = np.maximum(0.001, (weight + volume * 0.2) / 1000.0)
+    d = distance[:, None]
+    t = ton_equivalent[:, None]
+
+    # rounded exactly like the comparison dict, so scores match the scalar heuristic
+    cost = np.round(cost_per_km * d * (t * 100), 2)
+    time_hours = np.round(d / avg_speed_kmph, 2)
+    co2 = np.round(co2_per_km_per_ton * d * t * 1000.0, 2)
+
+    priority_factor = np.maximum(0.5, 1.0 - (priority - 1) * 0.12)[:, None]
+    score = (
+        cost * objective["cost"]
+        + (time_hours * 100.0) * objective["time"] * (1.0 / priority_factor)
+        + co2 * objective["co2"]
+    )
+    return ton_equivalent, cost, time_hours, co2, score
+
+
+def _fit_ranked(cand, ton_equivalent, tons_left, slots_left):
+    """
+    Mask of the (already ranked) candidates accepted first-fit: walk the ranking and take every
+    candidate that still fits in the remaining tons/slots, skipping those that don't.
+    Vectorized as repeated cumsums: accept the leading run that fits, drop what no longer fits, repeat.
+    """
+    fits = np.zeros(cand.size, dtype=bool)
+    tons = ton_equivalent[cand]
+    open_idx = np.arange(cand.size)
+    while open_idx.size and slots_left >= 1:
+        open_idx = open_idx[tons[open_idx] <= tons_left + 1e-9]
+        if open_idx.size == 0:
+            break
+        within = np.cumsum(tons[open_idx]) <= tons_left + 1e-9
+        within &= np.arange(1, open_idx.size + 1) <= slots_left
+        k = int(within.sum())  # both tests are monotone, so `within` is a leading run
+        take = open_idx[:k]
+        fits[take] = True
+        tons_left -= tons[take].sum()
+        slots_left -= k
+        open_idx = open_idx[k:]
+    return fits
+
+
+def _swap_pass(assign, score, available, ton_equivalent, tons_left, window=64):
+    """
+    2-exchange move: for every pair of modes (a, b), swap a shipment on a with one on b when the
+    swap lowers the combined score and both modes stay within tons (slot counts don't change).
+    Shipments on a are taken best-gain first; each is paired with the cheapest unused shipment on b
+    whose tonnage keeps both modes feasible (searching at most `window` neighbouring tonnages).
+    Returns the number of shipments moved.
+    """
+    swapped = 0
+    for a in range(len(MODES)):
+        for b in range(a + 1, len(MODES)):
+            on_a = np.flatnonzero((assign == a) & available[:, b])
+            on_b = np.flatnonzero((assign == b) & available[:, a])
+            if on_a.size == 0 or on_b.size == 0:
+                continue
+            # score change of moving each shipment to the other mode
+            delta_a = score[on_a, b] - score[on_a, a]
+            delta_b = score[on_b, a] - score[on_b, b]
+            # only shipments on a that could pair with the cheapest b-move are worth trying
+            keep = delta_a + delta_b.min() < -1e-9
+            on_a, delta_a = on_a[keep], delta_a[keep]
+            if on_a.size == 0:
+                continue
+            order = np.argsort(delta_a, kind="stable")
+            on_a, delta_a = on_a[order], delta_a[order]
+            order = np.argsort(ton_equivalent[on_b], kind="stable")
+            on_b, delta_b = on_b[order], delta_b[order].copy()
+            tons_b_sorted = ton_equivalent[on_b]
+
+            # tonnage windows t_i - tons_left[b] <= t_j <= t_i + tons_left[a], found for all i at once;
+            # slack shifts as swaps are accepted, so each swap is re-checked exactly below
+            t_a = ton_equivalent[on_a]
+            lo = np.searchsorted(tons_b_sorted, t_a - tons_left[b] - 1e-9, side="left")
+            hi = np.searchsorted(tons_b_sorted, t_a + tons_left[a] + 1e-9, side="right")
+            mid = np.searchsorted(tons_b_sorted, t_a)
+            lo = np.maximum(lo, mid - window // 2)
+            hi = np.minimum(hi, mid + window // 2)
+            live = hi > lo
+
+            pairs_a, pairs_b = [], []
+            for i, d_i, t_i, l, h in zip(
+                on_a[live].tolist(), delta_a[live].tolist(), t_a[live].tolist(), lo[live].tolist(), hi[live].tolist()
+            ):
+                j = l + int(delta_b[l:h].argmin())
+                if d_i + delta_b[j] >= -1e-9:
+                    continue
+                dt = tons_b_sorted[j] - t_i  # tons entering a, leaving b
+                if dt > tons_left[a] + 1e-9 or -dt > tons_left[b] + 1e-9:
+                    continue
+                tons_left[a] -= dt
+                tons_left[b] += dt
+                delta_b[j] = np.inf  # used
+                pairs_a.append(i)
+                pairs_b.append(on_b[j])
+            if pairs_a:
+                assign[pairs_a] = b
+                assign[pairs_b] = a
+                swapped += 2 * len(pairs_a)
+    return swapped
+
+
+def _room(ton_equivalent, tons_left, slots_left):
+    """(n, 4) mask: True where the mode still has a slot and enough tons left for the shipment."""
+    return (ton_equivalent[:, None] <= tons_left + 1e-9) & (slots_left >= 1)
+
+
+def _eject_pass(assign, score, available, ton_equivalent, tons_left, slots_left, window=64):
+    """
+    Ejection move, for placing as many shipments as possible: an unplaced shipment i that needs mode m
+    takes the place of a shipment j on m, and j moves to another mode m' that still has room, even if
+    that costs more. Only one shipment is ejected per placement (no longer chains).
+    Unplaced shipments go lightest first; each is matched with the j that is cheapest to move,
+    among the `window` lightest shipments on m that free enough tons.
+    Returns the number of shipments moved or placed.
+    """
+    moved = 0
+    for m in range(len(MODES)):
+        unplaced = np.flatnonzero((assign == -1) & available[:, m])
+        if unplaced.size == 0:
+            continue
+        on_m = np.flatnonzero(assign == m)
+        # cheapest other mode with room for each shipment on m
+        alt_score = np.where(_room(ton_equivalent[on_m], tons_left, slots_left), score[on_m], np.inf)
+        alt_score[:, m] = np.inf
+        alt = np.argmin(alt_score, axis=1)
+        delta = alt_score[np.arange(on_m.size), alt] - score[on_m, m]
+        movable = np.isfinite(delta)
+        on_m, alt, delta = on_m[movable], alt[movable], delta[movable]
+
+        order = np.argsort(ton_equivalent[on_m], kind="stable")
+        on_m, alt, delta = on_m[order], alt[order], delta[order]
+        tons_on_m = ton_equivalent[on_m].tolist()
+        unplaced = unplaced[np.argsort(ton_equivalent[unplaced], kind="stable")]
+
+        for i in unplaced.tolist():
+            t_i = ton_equivalent[i]
+            if t_i <= tons_left[m] + 1e-9 and slots_left[m] >= 1:
+                assign[i] = m  # room opened up; no ejection needed
+                tons_left[m] -= t_i
+                slots_left[m] -= 1
+                moved += 1
+                continue
+            if slots_left[m] < 0 or not tons_on_m:
+                continue
+            lo = bisect_left(tons_on_m, t_i - tons_left[m] - 1e-9)
+            hi = min(len(tons_on_m), lo + window)
+            while lo < hi:
+                k = lo + int(delta[lo:hi].argmin())
+                if not np.isfinite(delta[k]):
+                    break
+                j, m2 = on_m[k], alt[k]
+                t_j = ton_equivalent[j]
+                if t_j <= tons_left[m2] + 1e-9 and slots_left[m2] >= 1:
+                    break
+                delta[k] = np.inf  # its alternative filled up meanwhile
+            else:
+                continue
+            if not np.isfinite(delta[k]):
+                continue
+            assign[j] = m2
+            tons_left[m2] -= t_j
+            slots_left[m2] -= 1
+            assign[i] = m
+            tons_left[m] += t_j - t_i
+            delta[k] = np.inf  # j has left m
+            moved += 2
+    return moved
+
+
+def optimize_mode_assignment(
+    weight,
+    volume,
+    distance,
+    priority,
+    available,
+    capacity: Optional[Dict[str, Dict[str, Optional[float]]]] = None,
+    objective: Optional[Dict[str, float]] = None,
+    max_passes: int = 10
+) -> Dict:
+    """
+    Jointly assign a mode to every shipment under per-mode capacity limits.
+
+    weight, volume, distance, priority: 1-D array-likes of length n.
+    available: (n, 4) array-like of 0/1 flags in MODES order.
+    capacity[mode] = {"tons": ..., "slots": ...}; missing modes / None values are unlimited.
+    objective = {"cost": ..., "time": ..., "co2": ...}; defaults to the scalar heuristic's weights.
+
+    Uses the same cost/time/CO₂ model as predict_mode_with_reason (without its priority>=4 Air
+    override, which would ignore capacity). Solver: a vectorized regret-ordered greedy pass, then
+    local search repeating three moves until none applies. Placing shipments comes before score:
+      1. ejection: place an unplaced shipment by moving one placed shipment to another mode with room;
+      2. relocation: move a shipment (placed or not) to a cheaper mode with spare capacity;
+      3. swap: exchange shipments between two modes when that lowers the score.
+    Ejection moves one shipment per placement, so a placement that needs a longer chain can be missed.
+
+    The unconstrained optimum (every shipment on its own best mode) is a lower bound on any
+    capacity-feasible assignment. Shipments that can't be placed have no score, so the result splits
+    that bound in two instead of hiding the dropped ones:
+      - optimality_gap = objective - lower bound of the placed shipments (optimality_gap_pct is
+        relative to that bound);
+      - unplaced_lower_bound = lower bound of the feasible shipments left unassigned
+        (unplaced_pct is its share of unconstrained_objective).
+    so objective - unconstrained_objective == optimality_gap - unplaced_lower_bound.
+    """
+    objective = {**DEFAULT_OBJECTIVE, **(objective or {})}
+    capacity = capacity or {}
+    unknown = set(capacity) - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown mode(s) in capacity: {sorted(unknown)}; expected {list(MODES)}")
+    negative = [f"{m}.{k}" for m, c in capacity.items() for k, v in c.items() if v is not None and v < 0]
+    negative += [f"objective.{k}" for k, v in objective.items() if v < 0]
+    if negative:
+        raise ValueError(f"Capacity limits and objective weights must be non-negative: {negative}")
+
+    weight = np.asarray(weight, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    distance = np.asarray(distance, dtype=float)
+    priority = np.asarray(priority, dtype=float)
+    available = np.asarray(available, dtype=bool).reshape(-1, len(MODES))
+    n = available.shape[0]
+    rows = np.arange(n)
+
+    ton_equivalent, cost, time_hours, co2, score = _score_matrix(weight, volume, distance, priority, objective)
+    score = np.where(available, score, np.inf)
+
+    tons_cap = np.array([
+        np.inf if capacity.get(m, {}).get("tons") is None else float(capacity[m]["tons"]) for m in MODES
+    ])
+    slots_cap = np.array([
+        np.inf if capacity.get(m, {}).get("slots") is None else float(capacity[m]["slots"]) for m in MODES
+    ])
+
+    # Unconstrained optimum: each shipment on its own best mode
+    feasible = available.any(axis=1)
+    best = np.argmin(score, axis=1)
+    best_score = np.where(feasible, score[rows, best], 0.0)
+
+    # -------------------------
+    # Greedy pass: every round, each pending shipment bids for its best mode that is not banned and
+    # still has room; each mode accepts bids first-fit in rank order and bans the ones that don't fit.
+    # Rank = regret, how much a shipment loses if pushed to its next open mode; recomputed every round
+    # since capacity only shrinks (a mode that is full no longer counts as anyone's fallback).
+    # -------------------------
+    assign = np.full(n, -1)
+    banned = ~available
+    tons_left = tons_cap.copy()
+    slots_left = slots_cap.copy()
+    while True:
+        banned |= ~_room(ton_equivalent, tons_left, slots_left)
+        pending = np.flatnonzero((assign == -1) & ~banned.all(axis=1))
+        if pending.size == 0:
+            break
+        open_score = np.where(banned[pending], np.inf, score[pending])
+        pref = np.argmin(open_score, axis=1)
+        two_best = np.partition(open_score, 1, axis=1)[:, :2]
+        with np.errstate(invalid="ignore"):
+            regret = two_best[:, 1] - two_best[:, 0]  # inf when only one mode is left
+        for m in range(len(MODES)):
+            bids = pref == m
+            cand = pending[bids]
+            if cand.size == 0:
+                continue
+            # when tons are scarce, rank by regret per ton (knapsack density); ties go lightest first
+            key = regret[bids] / ton_equivalent[cand] if np.isfinite(tons_cap[m]) else regret[bids]
+            cand = cand[np.lexsort((ton_equivalent[cand], -key))]
+            fits = _fit_ranked(cand, ton_equivalent, tons_left[m], slots_left[m])
+            take = cand[fits]
+            assign[take] = m
+            tons_left[m] -= ton_equivalent[take].sum()
+            slots_left[m] -= take.size
+            banned[cand[~fits], m] = True
+
+    # -------------------------
+    # Local search: eject to place unplaced shipments, then relocate shipments to a cheaper mode with
+    # spare capacity (unplaced ones count as infinitely expensive, so they go wherever room has opened
+    # up), then swap pairs of shipments between modes; repeat until no move applies.
+    # None of the moves unplaces a shipment, so the number placed never goes down.
+    # -------------------------
+    for _ in range(max_passes):
+        moved = _eject_pass(assign, score, available, ton_equivalent, tons_left, slots_left)
+        current = np.where(assign >= 0, score[rows, np.maximum(assign, 0)], np.inf)
+        for m in range(len(MODES)):
+            with np.errstate(invalid="ignore"):
+                gain = current - score[:, m]
+            cand = np.flatnonzero((gain > 1e-9) & available[:, m] & (assign != m))
+            if cand.size == 0:
+                continue
+            cand = cand[np.argsort(-gain[cand], kind="stable")]
+            take = cand[_fit_ranked(cand, ton_equivalent, tons_left[m], slots_left[m])]
+            if take.size == 0:
+                continue
+            src = assign[take]
+            freed = src >= 0
+            np.add.at(tons_left, src[freed], ton_equivalent[take[freed]])
+            np.add.at(slots_left, src[freed], 1)
+            assign[take] = m
+            current[take] = score[take, m]
+            tons_left[m] -= ton_equivalent[take].sum()
+            slots_left[m] -= take.size
+            moved += take.size
+        moved += _swap_pass(assign, score, available, ton_equivalent, tons_left)
+        if not moved:
+            break
+
+    assigned = assign >= 0
+    a_rows, a_modes = rows[assigned], assign[assigned]
+    objective_value = float(score[a_rows, a_modes].sum())
+    unconstrained = float(best_score.sum())
+    placed_lower_bound = float(best_score[assigned].sum())
+    unplaced_lower_bound = unconstrained - placed_lower_bound
+    gap = objective_value - placed_lower_bound
+
+    mode_names = np.array(MODES + ("None",))
+    mode_usage = {}
+    for i, m in enumerate(MODES):
+        on_mode = assign == i
+        mode_usage[m] = {
+            "shipments": int(on_mode.sum()),
+            "tons": round(float(ton_equivalent[on_mode].sum()), 3),
+            "tons_capacity": None if np.isinf(tons_cap[i]) else float(tons_cap[i]),
+            "slots_capacity": None if np.isinf(slots_cap[i]) else int(slots_cap[i])
+        }
+
+    return {
+        "assignments": mode_names[assign].tolist(),
+        "objective": round(objective_value, 2),
+        "unconstrained_objective": round(unconstrained, 2),
+        "optimality_gap": round(gap, 2),
+        "optimality_gap_pct": round(100.0 * gap / placed_lower_bound, 4) if placed_lower_bound > 0 else 0.0,
+        "unplaced_lower_bound": round(unplaced_lower_bound, 2),
+        "unplaced_pct": round(100.0 * unplaced_lower_bound / unconstrained, 4) if unconstrained > 0 else 0.0,
+        "moved_from_best_mode": int((assign[assigned] != best[assigned]).sum()),
+        "unassigned": int((~assigned).sum()),  # includes the infeasible ones
+        "infeasible": int((~feasible).sum()),  # no mode available at all
+        "totals": {
+            "estimated_cost": round(float(cost[a_rows, a_modes].sum()), 2),
+            "time_hours": round(float(time_hours[a_rows, a_modes].sum()), 2),
+            "co2_kg": round(float(co2[a_rows, a_modes].sum()), 2)
+        },
+        "mode_usage": mode_usage
+    }
@@ -1,6 +1,7 @@
 # schemas.py
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from ml_model import DEFAULT_OBJECTIVE
 
 class TransportBase(BaseModel):
     weight: int
@@ -21,3 +22,30 @@ class Transport(TransportBase):
 
     class Config:
         orm_mode = True
+
+# -------------------------
+# Fleet-level assignment
+# -------------------------
+class Shipment(BaseModel):
+    weight: int
+    volume: int
+    distance: int
+    priority: int
+    road_available: int
+    rail_available: int
+    air_available: int
+    water_available: int
+
+class ModeCapacity(BaseModel):
+    tons: Optional[float] = Field(None, ge=0)   # None = unlimited
+    slots: Optional[int] = Field(None, ge=0)    # max number of shipments; None = unlimited
+
+class ObjectiveWeights(BaseModel):
+    cost: float = Field(DEFAULT_OBJECTIVE["cost"], ge=0)
+    time: float = Field(DEFAULT_OBJECTIVE["time"], ge=0)
+    co2: float = Field(DEFAULT_OBJECTIVE["co2"], ge=0)
+
+class AssignmentRequest(BaseModel):
+    shipments: List[Shipment]
+    capacity: Dict[str, ModeCapacity] = {}  # keyed by mode: Road, Rail, Air, Water
+    objective: ObjectiveWeights = ObjectiveWeights()